@@ -5,12 +5,38 @@ Fixed version with proper Gemini model name and error handling
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import google.generativeai as genai
+import httpx
+import asyncio
+import hashlib
 import os
-from typing import Optional, Dict, Any
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Tuple
 
-app = FastAPI(title="FinAI Backend API")
+# Works both as part of the server package (uvicorn server.main:app from the
+# repo root) and as a top-level module (uvicorn main:app from server/)
+try:
+    from .prompts import build_prompt_with_context
+except ImportError:
+    from prompts import build_prompt_with_context
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared Gemini HTTP client on shutdown"""
+    yield
+    await _close_http_client()
+
+
+# Serialize all responses with orjson instead of the stdlib json encoder
+app = FastAPI(
+    title="FinAI Backend API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Configure CORS - allow Flutter app to make requests
 app.add_middleware(
@@ -24,7 +50,48 @@ app.add_middleware(
 # Configure Gemini AI
 # Make sure to set your API key in environment variables or here
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_API_KEY_HERE")
-genai.configure(api_key=GEMINI_API_KEY)
+
+# FIX 1: Use a model id available on the v1beta REST API
+# Give the bare id (e.g. 'gemini-pro', 'gemini-1.5-flash', 'gemini-1.5-pro');
+# GEMINI_GENERATE_URL adds the 'models/' prefix itself. Moving to the v1 API
+# also means changing 'v1beta' in the URL below.
+GEMINI_MODEL = "gemini-pro"
+GEMINI_GENERATE_URL = (
+    f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+)
+
+# The SDK is heavy to import, so it is loaded and configured on first use
+# rather than at startup (see _get_genai). Only model listing still uses it;
+# generation goes over the shared HTTP client below.
+_genai = None
+
+# Cap how many Gemini generation calls are in flight at once to stay within
+# upstream rate limits; the shared HTTP client keeps the same number of
+# connections alive. Model listing (/models, /health) is not gated so health
+# probes never queue behind slow generations.
+GEMINI_MAX_CONCURRENCY = 32
+GEMINI_TIMEOUT_SECONDS = 30
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Pooled HTTP/2 client for Gemini generation, created on first use (see
+# _get_http_client) so it works even where startup events never run. Its
+# connections belong to the event loop it was created on, so that loop is
+# remembered and the client is rebuilt if a request arrives on another one.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Cache of AI responses keyed by a hash of the full prompt, so repeated
+# questions with the same context skip the Gemini round-trip
+RESPONSE_CACHE_MAX_SIZE = 10000
+RESPONSE_CACHE_TTL_SECONDS = 3600
+_response_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+# Static payload for the root health check, built once instead of per request
+_ROOT_STATUS = {
+    "status": "online",
+    "service": "FinAI Backend API",
+    "version": "1.0.0"
+}
 
 
 class GenerateRequest(BaseModel):
@@ -41,11 +108,7 @@ class GenerateResponse(BaseModel):
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "status": "online",
-        "service": "FinAI Backend API",
-        "version": "1.0.0"
-    }
+    return _ROOT_STATUS
 
 
 @app.post("/generate", response_model=GenerateResponse)
@@ -60,23 +123,23 @@ async def generate_finance_advice(request: GenerateRequest):
         GenerateResponse with success status, AI response, or error message
     """
     try:
-        # FIX 1: Use correct model name for v1beta API
-        # Use 'gemini-pro' for v1beta (most stable and widely available)
-        # For v1 API, you can use: 'models/gemini-1.5-flash' or 'models/gemini-1.5-pro'
-        model = genai.GenerativeModel('gemini-pro')
-        
         # Build enhanced prompt with financial context
-        full_prompt = _build_prompt_with_context(request.prompt, request.context)
-        
-        # Generate AI response
-        response = model.generate_content(full_prompt)
+        full_prompt = build_prompt_with_context(request.prompt, request.context)
+        cache_key = _prompt_cache_key(full_prompt)
         
-        # Extract text from response
-        ai_response = response.text
+        # Serve repeated questions from cache without calling Gemini
+        ai_response = _get_cached_response(cache_key)
         
-        # FIX 2: Only return success=True if we actually got a response
-        if not ai_response or len(ai_response.strip()) == 0:
-            raise Exception("Empty response from AI model")
+        if ai_response is None:
+            # Generate AI response over the pooled HTTP client
+            async with _gemini_semaphore:
+                ai_response = await _generate_content(_get_http_client(), full_prompt)
+            
+            # FIX 2: Only return success=True if we actually got a response
+            if not ai_response or len(ai_response.strip()) == 0:
+                raise Exception("Empty response from AI model")
+            
+            _store_cached_response(cache_key, ai_response)
         
         return GenerateResponse(
             success=True,
@@ -97,66 +160,167 @@ async def generate_finance_advice(request: GenerateRequest):
         )
 
 
-def _build_prompt_with_context(user_prompt: str, context: Optional[Dict[str, Any]]) -> str:
+def _get_genai():
+    """Import and configure the Gemini SDK on first use"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared Gemini HTTP client for the running event loop"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    
+    # A client from a previous (possibly dead) loop can't be closed from
+    # here, so it is dropped rather than reused
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=GEMINI_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONCURRENCY,
+                max_keepalive_connections=GEMINI_MAX_CONCURRENCY,
+            ),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def _close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections, if opened"""
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        _http_client_loop = None
+
+
+async def _generate_content(http: httpx.AsyncClient, full_prompt: str) -> str:
     """
-    Build an enhanced prompt with financial context for better AI responses
+    Call the Gemini generateContent REST endpoint and return the response text
     
     Args:
-        user_prompt: The user's question
-        context: Optional financial data (spending, savings, transactions, etc.)
+        http: Shared pooled client (see _get_http_client), so connections are reused
+        full_prompt: Prompt to send to the model
     
     Returns:
-        Enhanced prompt string with context
+        Concatenated text of the first candidate
+    
+    Raises:
+        Exception: With a descriptive message if the request fails, the API
+            returns an error, or the response carries no text
     """
-    if not context:
-        return f"""You are FinAI, a helpful personal finance assistant. 
-Answer the following question in a friendly, concise manner:
+    try:
+        response = await http.post(
+            GEMINI_GENERATE_URL,
+            headers={"x-goog-api-key": GEMINI_API_KEY},
+            json={"contents": [{"parts": [{"text": full_prompt}]}]},
+        )
+    except httpx.HTTPError as e:
+        # Timeouts often stringify to "", so always name the exception type
+        message = f"Gemini request failed: {type(e).__name__}"
+        detail = str(e)
+        raise Exception(f"{message}: {detail}" if detail else message) from e
+    
+    if response.is_error:
+        raise Exception(_gemini_error_message(response))
+    
+    body = response.json()
+    candidates = body.get("candidates") or []
+    parts = (candidates[0].get("content") or {}).get("parts", []) if candidates else []
+    ai_response = "".join(part.get("text", "") for part in parts)
+    
+    if not ai_response.strip():
+        raise Exception(_empty_response_message(body))
+    return ai_response
+
 
-{user_prompt}"""
+def _gemini_error_message(response: httpx.Response) -> str:
+    """
+    Extract Google's error.message from a failed Gemini response
     
-    # Build context string
-    context_parts = []
+    Args:
+        response: Non-2xx response from the Gemini REST API
     
-    if 'user_name' in context:
-        context_parts.append(f"User: {context['user_name']}")
+    Returns:
+        The API's own error text (API key redacted), or the HTTP status if the
+        body carries no message
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
     
-    if 'currency' in context:
-        context_parts.append(f"Currency: {context['currency']}")
+    # Errors come back as {"error": {...}}, occasionally wrapped in a list
+    if isinstance(body, list) and body:
+        body = body[0]
+    error = body.get("error") if isinstance(body, dict) else None
+    message = error.get("message") if isinstance(error, dict) else None
     
-    if 'financial_health_score' in context:
-        context_parts.append(f"Financial Health Score: {context['financial_health_score']}/100")
+    if not message:
+        return f"Gemini API error: HTTP {response.status_code}"
+    if GEMINI_API_KEY:
+        message = message.replace(GEMINI_API_KEY, "[REDACTED]")
+    return message
+
+
+def _empty_response_message(body: Dict[str, Any]) -> str:
+    """
+    Explain why a successful Gemini response carried no text
     
-    if 'monthly_spending' in context:
-        context_parts.append(f"Monthly Spending: {context['monthly_spending']}")
+    Args:
+        body: Parsed generateContent response body
     
-    if 'monthly_savings' in context:
-        context_parts.append(f"Monthly Savings: {context['monthly_savings']}")
+    Returns:
+        Error message including the block or finish reason when Gemini gave one
+    """
+    block_reason = (body.get("promptFeedback") or {}).get("blockReason")
+    if block_reason:
+        return f"Empty response from AI model (prompt blocked: {block_reason})"
     
-    if 'spending_by_category' in context:
-        categories = context['spending_by_category']
-        category_str = ", ".join([f"{k}: {v}" for k, v in categories.items()])
-        context_parts.append(f"Spending by Category: {category_str}")
+    candidates = body.get("candidates") or []
+    finish_reason = candidates[0].get("finishReason") if candidates else None
+    if finish_reason:
+        return f"Empty response from AI model (finish reason: {finish_reason})"
     
-    if 'recent_transactions' in context:
-        transactions = context['recent_transactions']
-        trans_str = ", ".join([
-            f"{t.get('merchant', 'Unknown')} (${t.get('amount', 0)}, {t.get('category', 'Other')})"
-            for t in transactions[:5]  # Limit to 5 recent
-        ])
-        context_parts.append(f"Recent Transactions: {trans_str}")
+    return "Empty response from AI model"
+
+
+def _prompt_cache_key(full_prompt: str) -> str:
+    """Hash a prompt (trimmed, otherwise exact) into a response cache key"""
+    return hashlib.sha1(full_prompt.strip().encode("utf-8")).hexdigest()
+
+
+def _get_cached_response(key: str) -> Optional[str]:
+    """Return a cached AI response if present and not expired"""
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
     
-    context_text = "\n".join(context_parts)
+    ai_response, cached_at = entry
+    if time.monotonic() - cached_at > RESPONSE_CACHE_TTL_SECONDS:
+        _response_cache.pop(key, None)
+        return None
     
-    return f"""You are FinAI, a helpful personal finance assistant.
+    _response_cache.move_to_end(key)
+    return ai_response
+
 
-FINANCIAL CONTEXT:
-{context_text}
+def _store_cached_response(key: str, ai_response: str) -> None:
+    """Insert an AI response into the cache, evicting the oldest entry when full"""
+    _response_cache[key] = (ai_response, time.monotonic())
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_MAX_SIZE:
+        _response_cache.popitem(last=False)
 
-USER QUESTION:
-{user_prompt}
 
-Provide a helpful, personalized response based on the financial context above. 
-Be concise, friendly, and actionable. If suggesting actions, be specific."""
+async def _list_models() -> list:
+    """Fetch the Gemini model list in a worker thread so the event loop stays free"""
+    return await asyncio.to_thread(lambda: list(_get_genai().list_models()))
 
 
 @app.get("/models")
@@ -167,7 +331,7 @@ async def list_available_models():
     """
     try:
         models_list = []
-        for model in genai.list_models():
+        for model in await _list_models():
             if 'generateContent' in model.supported_generation_methods:
                 models_list.append({
                     "name": model.name,
@@ -193,7 +357,7 @@ async def health_check():
     """Check if the API and Gemini connection are working"""
     try:
         # Test if we can list models (verifies API key and connection)
-        list(genai.list_models())
+        await _list_models()
         return {
             "status": "healthy",
             "api_configured": True,
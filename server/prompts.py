@@ -0,0 +1,98 @@
+"""
+FinAI prompt construction
+Shared builder for the Gemini prompts sent by the FinAI backend
+"""
+
+from typing import Optional, Dict, Any
+
+# Static prompt skeleton, built once at import; only the context and the
+# user question are spliced in per request
+_PROMPT_NO_CONTEXT_PREFIX = """You are FinAI, a helpful personal finance assistant. 
+Answer the following question in a friendly, concise manner:
+
+"""
+_PROMPT_CONTEXT_PREFIX = """You are FinAI, a helpful personal finance assistant.
+
+FINANCIAL CONTEXT:
+"""
+_PROMPT_CONTEXT_SUFFIX_TEMPLATE = """
+
+USER QUESTION:
+{user_prompt}
+
+Provide a helpful, personalized response based on the financial context above. 
+Be concise, friendly, and actionable. If suggesting actions, be specific."""
+
+# Upper bound on the context block so oversized payloads don't blow up the
+# token count (and generation time) of the Gemini request; only whole
+# entries are kept
+MAX_CONTEXT_CHARS = 4000
+
+
+def build_prompt_with_context(user_prompt: str, context: Optional[Dict[str, Any]]) -> str:
+    """
+    Build an enhanced prompt with financial context for better AI responses
+    
+    Args:
+        user_prompt: The user's question
+        context: Optional financial data (spending, savings, transactions, etc.)
+    
+    Returns:
+        Enhanced prompt string with context
+    """
+    if not context:
+        return _PROMPT_NO_CONTEXT_PREFIX + user_prompt
+    
+    # Build context string
+    context_parts = []
+    
+    if 'user_name' in context:
+        context_parts.append(f"User: {context['user_name']}")
+    
+    if 'currency' in context:
+        context_parts.append(f"Currency: {context['currency']}")
+    
+    if 'financial_health_score' in context:
+        context_parts.append(f"Financial Health Score: {context['financial_health_score']}/100")
+    
+    if 'monthly_spending' in context:
+        context_parts.append(f"Monthly Spending: {context['monthly_spending']}")
+    
+    if 'monthly_savings' in context:
+        context_parts.append(f"Monthly Savings: {context['monthly_savings']}")
+    
+    if 'spending_by_category' in context:
+        categories = context['spending_by_category']
+        category_str = ", ".join([f"{k}: {v}" for k, v in categories.items()])
+        context_parts.append(f"Spending by Category: {category_str}")
+    
+    if 'recent_transactions' in context:
+        transactions = context['recent_transactions']
+        trans_str = ", ".join([
+            f"{t.get('merchant', 'Unknown')} (${t.get('amount', 0)}, {t.get('category', 'Other')})"
+            for t in transactions[:5]  # Limit to 5 recent
+        ])
+        context_parts.append(f"Recent Transactions: {trans_str}")
+    
+    # Keep whole entries only: skip any entry that would overflow the block but
+    # still take later ones that fit, so a value is never cut in half
+    kept_parts = []
+    used_chars = 0
+    for part in context_parts:
+        needed = len(part) + (1 if kept_parts else 0)
+        if used_chars + needed > MAX_CONTEXT_CHARS:
+            continue
+        kept_parts.append(part)
+        used_chars += needed
+    
+    # Nothing fit, so don't point the model at an empty context section
+    if not kept_parts:
+        return _PROMPT_NO_CONTEXT_PREFIX + user_prompt
+    
+    context_text = "\n".join(kept_parts)
+    
+    return (
+        _PROMPT_CONTEXT_PREFIX
+        + context_text
+        + _PROMPT_CONTEXT_SUFFIX_TEMPLATE.format(user_prompt=user_prompt)
+    )